@@ -7,10 +7,13 @@ import sys
 import subprocess
 import threading
 from contextlib import suppress
-from typing import Optional, List, Tuple, Set, Any, Dict
+from typing import Optional, List, Tuple, Set, Any, Dict, Iterable
 import tkinter as tk
 from tkinter import ttk, messagebox
 import random
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
 from datetime import datetime
 
 # 嘗試匯入 yt_dlp
@@ -28,7 +31,7 @@ except (ImportError, OSError):
     vlc = None
 
 from config import ConfigManager
-from async_worker import AsyncWorker
+from async_worker import AsyncWorker, BG_EXEC
 from utils import locate_ffmpeg_exe
 from cache import SmartCacheManager
 from log_viewer import LogViewer
@@ -38,6 +41,12 @@ LOG = logging.getLogger("ytplayer.app")
 
 
 class PlayerApp:
+    # 取得音訊串流的格式；以 / 分隔的備援由 yt-dlp 在同一次擷取中依序選擇
+    STREAM_FORMAT = 'bestaudio[ext=m4a]/bestaudio/best'
+    # 載入播放清單時分批送往 UI：第一批小以便盡快可播放，之後較大以減少 UI 更新次數
+    PLAYLIST_FIRST_BATCH = 50
+    PLAYLIST_BATCH = 200
+
     def __init__(self, root: tk.Tk, log_viewer: LogViewer):
         self.root = root
         self.root.title("YT Player")
@@ -47,25 +56,66 @@ class PlayerApp:
         # --- 核心元件 ---
         self.log_viewer = log_viewer
         self.config = ConfigManager()
+        self.log_viewer.set_max_records(self.config.get('log_max_records', LogViewer.DEFAULT_MAX_RECORDS))
+        # 縮短 GIL 切換間隔 (預設 5 ms)：大量插入列表等 Tk 工作期間，背景擷取執行緒仍能及時取得執行權；
+        # 代價是稍多的執行緒切換開銷，對此 I/O 為主的程式可忽略
+        sys.setswitchinterval(float(self.config.get('switch_interval_sec', 0.001)))
         self.async_worker = AsyncWorker()
-        self.ydl_opts_common = {'quiet': True, 'nocheckcertificate': True, 'verbose': False}
+        self.ydl_opts_common = {
+            'quiet': True, 'nocheckcertificate': True, 'verbose': False,
+            # 讓 yt-dlp 將解密用的 player JS 持久化，跨次啟動重複使用
+            'cachedir': str(self.config.path.parent / 'ytdlp_cache'),
+        }
+        # 各用途的 yt-dlp 選項只在建構時產生一次
+        self._ydl_opts_flat = {**self.ydl_opts_common, 'extract_flat': True, 'skip_download': True, 'lazy_playlist': True}
+        self._ydl_opts_stream = {**self.ydl_opts_common, 'format': self.STREAM_FORMAT, 'skip_download': True}
+        # 長駐的 YoutubeDL 實例：YoutubeDL 並非執行緒安全，因此每個 executor 執行緒各自持有一組 (依選項分組)
+        self._ydl_local = threading.local()
+        self._ydl_all: List[Any] = []  # 所有執行緒建立過的實例，供結束時關閉
+        self._ydl_all_lock = threading.Lock()
         
         # --- 快取 ---
         self.playlist_cache = SmartCacheManager(app_name=self.config.app_name, default_ttl=3600)
+        # 串流網址為簽章網址，數十分鐘後失效，因此只短暫快取，並與播放清單分開存放以免互相淘汰
+        self.stream_cache = SmartCacheManager(app_name=self.config.app_name, cache_file="stream_cache.db",
+                                              max_size=200, default_ttl=300)
 
         # --- 播放清單 ---
         self.playlist_urls: List[str] = []
         self.playlist_titles: List[str] = []
         self.current_idx: Optional[int] = None
         self.unavailable_indices: Set[int] = set()
+        self._display_rows: List[str] = []  # 預先格式化的列表文字，只在清單內容改變時產生
+        self._available: List[int] = []  # 已排序的可播放索引，與 unavailable_indices 互補
+        # 每次載入遞增；用來丟棄使用者已改載其他清單後才抵達的批次
+        self._load_generation = 0
+        self._streamed_generation = -1
+        # 待刷新的不可用索引，連續跳過多首時合併成一次列表更新
+        self._pending_unavail: Set[int] = set()
+        self._unavail_flush_job: Optional[str] = None
+
+        # --- 下一首串流預取 (index -> (title, stream_url, resolved_at)) ---
+        self._prefetched: "OrderedDict[int, Tuple[str, str, float]]" = OrderedDict()
+        self._prefetch_max = 8
+        self._prefetch_inflight: Set[str] = set()  # 正在預取中的影片網址，避免重複送出
+        self._prefetch_ttl = float(self.config.get('prefetch_ttl_sec', 600))  # 以串流網址實際解析的時間起算
+        # 目前交給 VLC 的曲目 (索引, 影片網址)；播放未開始就結束或出錯時，代表快取的串流網址可能已失效
+        self._playing: Optional[Tuple[int, str]] = None
+        self._playback_started = False
+        self._stream_retry_idx: Optional[int] = None
 
         # --- VLC 播放器 ---
         self.vlc_inst: Optional[Any] = None
         self.vlc_player: Optional[Any] = None
+        self._vlc_init_pending = False
 
         # --- UI 元件 ---
         self.url_entry: Optional[ttk.Entry] = None
         self.listbox: Optional[tk.Listbox] = None
+        self.listbox_scrollbar: Optional[ttk.Scrollbar] = None
+        # 列表目前顯示的內容與非預設樣式的列，用於略過不必要的 Tcl 呼叫
+        self._rendered_rows: List[str] = []
+        self._row_styles: Dict[int, Tuple[str, str]] = {}
         self.status_label: Optional[ttk.Label] = None
         self.history_popup: Optional[tk.Toplevel] = None
         self.history_details_modal: Optional[tk.Toplevel] = None
@@ -73,7 +123,15 @@ class PlayerApp:
         self.update_label: Optional[ttk.Label] = None
         self.update_button: Optional[ttk.Button] = None
         self.top_control_frame: Optional[ttk.Frame] = None
+        # 待套用的 UI 變更：由單一 after_idle 回呼一次處理，避免每個事件各自排程
+        self._ui_dirty: Dict[str, Any] = {'status': None, 'highlights': set(), 'listbox': False}
+        self._ui_flush_pending = False
+        self._click_bind_id: Optional[str] = None  # 歷史彈窗開啟期間才存在的主視窗點擊綁定
         
+        # --- 歷史紀錄排序快取 (歷史變動時失效) ---
+        self._sorted_history_cache: Optional[List[Dict[str, Any]]] = None
+        self._sorted_history_dirty = True
+
         # --- 播放結束事件防抖 ---
         self._last_end_event_time = 0.0
         self._end_debounce_sec = float(self.config.get('end_debounce_sec', 1.5))
@@ -83,10 +141,9 @@ class PlayerApp:
 
         # --- 事件綁定 ---
         self.root.protocol("WM_DELETE_WINDOW", self._quit_gracefully)
-        self.root.bind_all("<Button-1>", self._handle_root_click, add="+")
         self.root.bind("<Control-Shift-L>", lambda e: self.log_viewer.toggle_visibility())
         
-        self.root.after(100, self._load_last_playlist_on_startup)
+        self.root.after_idle(self._bootstrap_last_playlist)
 
     def build_ui(self):
         """建立應用程式的圖形使用者介面"""
@@ -120,6 +177,7 @@ class PlayerApp:
         self.url_entry = ttk.Entry(self.top_control_frame, font=font_main)
         self.url_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         self.url_entry.bind("<FocusIn>", self._show_history_popup)
+        self.url_entry.bind("<FocusOut>", self._on_url_entry_focus_out)
         self.url_entry.bind("<Button-1>", self._show_history_popup, add="+")
         
         self.load_button = ttk.Button(self.top_control_frame, text="載入", command=self.load_playlist, style='TButton')
@@ -136,7 +194,7 @@ class PlayerApp:
         )
         self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.listbox.bind("<Double-Button-1>", lambda e: self._on_list_double())
-        sb = ttk.Scrollbar(list_frame, command=self.listbox.yview)
+        self.listbox_scrollbar = sb = ttk.Scrollbar(list_frame, command=self.listbox.yview)
         sb.pack(side=tk.RIGHT, fill=tk.Y)
         self.listbox.config(yscrollcommand=sb.set)
 
@@ -168,15 +226,30 @@ class PlayerApp:
         try:
             # 在 Windows 上，不顯示主控台視窗
             creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-            process = subprocess.run(
-                [sys.executable, "-m", "pip", "install", "--upgrade", "yt-dlp"],
-                capture_output=True, text=True, check=True, encoding='utf-8',
-                creationflags=creationflags
+            cmd = [sys.executable, "-m", "pip", "install", "--upgrade", "yt-dlp"]
+            # pip 的安裝輸出只在 DEBUG 時需要，其餘情況直接丟棄，不在記憶體中緩衝與解碼
+            want_stdout = LOG.isEnabledFor(logging.DEBUG)
+            proc = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE if want_stdout else subprocess.DEVNULL,
+                stderr=subprocess.PIPE, creationflags=creationflags
             )
-            LOG.info("yt-dlp 更新成功:\n%s", process.stdout)
+            try:
+                stdout, stderr = proc.communicate(timeout=300)
+            except subprocess.TimeoutExpired as e:
+                proc.kill()
+                _, stderr = proc.communicate()
+                # 與 CalledProcessError 相同，將 stderr 解碼後再交給下方的錯誤處理
+                raise subprocess.TimeoutExpired(
+                    cmd, e.timeout, stderr=stderr.decode('utf-8', errors='replace') if stderr else None) from None
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(
+                    proc.returncode, cmd, stderr=stderr.decode('utf-8', errors='replace'))
+            if want_stdout:
+                LOG.debug("pip 輸出:\n%s", stdout.decode('utf-8', errors='replace'))
+            LOG.info("yt-dlp 更新成功")
             self.root.after(0, self._on_update_success)
-        except (subprocess.CalledProcessError, FileNotFoundError) as e:
-            error_output = e.stderr if hasattr(e, 'stderr') else str(e)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+            error_output = getattr(e, 'stderr', None) or str(e)
             LOG.error("yt-dlp 更新失敗: %s", error_output)
             self.root.after(0, self._on_update_failure, error_output)
 
@@ -199,16 +272,47 @@ class PlayerApp:
 
     # --- 事件與其他函式 ---
     def _handle_root_click(self, event):
-        if self.history_popup:
-            try:
-                if str(event.widget.winfo_toplevel()) == str(self.history_popup): return
-            except tk.TclError: pass
-        if event.widget != self.url_entry:
+        # 綁定在主視窗的 toplevel 標籤上，彈窗內的點擊本來就不會觸發，不需再檢查所屬視窗
+        if self.history_popup and event.widget != self.url_entry:
             self._hide_history_popup()
 
+    def _on_url_entry_focus_out(self, event):
+        # 焦點轉移在事件結束後才確定，延到閒置時再判斷
+        self.root.after_idle(self._hide_history_popup_if_unfocused)
+
+    def _hide_history_popup_if_unfocused(self):
+        if not self.history_popup: return
+        try:
+            focused = self.root.focus_get()
+        except (KeyError, tk.TclError):
+            focused = None
+        if focused is self.url_entry: return
+        if focused is not None and str(focused).startswith(str(self.history_popup)): return
+        self._hide_history_popup()
+
     def set_status(self, text: str):
-        if self.root.winfo_exists():
-            self.root.after(0, lambda: self.status_label and self.status_label.config(text=text))
+        # 只保留最新的文字，同一個閒置時段內的多次更新合併為一次
+        self._ui_dirty['status'] = text
+        self._request_ui_flush()
+
+    def _request_ui_flush(self):
+        if not self._ui_flush_pending and self.root.winfo_exists():
+            self._ui_flush_pending = True
+            self.root.after_idle(self._flush_ui)
+
+    def _flush_ui(self):
+        """套用所有累積的 UI 變更：列表重建、列顏色與狀態文字"""
+        self._ui_flush_pending = False
+        dirty = self._ui_dirty
+        if dirty['listbox']:
+            dirty['listbox'] = False
+            self._render_listbox()
+        if dirty['highlights']:
+            rows, dirty['highlights'] = dirty['highlights'], set()
+            self._render_highlights(rows)
+        if dirty['status'] is not None:
+            text, dirty['status'] = dirty['status'], None
+            if self.status_label: self.status_label.config(text=text)
 
     def _update_playlist_history(self, url: str):
         if not url: return
@@ -218,12 +322,32 @@ class PlayerApp:
         entry["count"] = entry.get("count", 0) + 1
         history[url] = entry
         self.config.set("playlist_history", history)
+        cache = self._sorted_history_cache
+        if cache is not None and not self._sorted_history_dirty:
+            # 剛使用的網址必定是最新的一筆，直接移到快取開頭即可，不需重新排序
+            if cache and cache[0]["url"] == url: cache.pop(0)
+            else: cache[:] = [item for item in cache if item["url"] != url]
+            cache.insert(0, self._make_history_item(url, entry))
+        else:
+            self._sorted_history_dirty = True
         LOG.info("已更新歷史紀錄: %s", url)
 
+    @staticmethod
+    def _make_history_item(url: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        last_used = entry.get("last_used", 0)
+        return {
+            "url": url, "last_used": last_used, "count": entry.get("count", 0),
+            # 顯示用字串隨快取一同產生，開啟詳細資料視窗時不必逐列格式化
+            "last_used_str": datetime.fromtimestamp(last_used).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
     def _get_sorted_playlist_history(self) -> List[Dict[str, Any]]:
+        if not self._sorted_history_dirty and self._sorted_history_cache is not None:
+            return self._sorted_history_cache
         history = self.config.get("playlist_history", {})
-        history_list = [{"url": k, **v} for k, v in history.items()]
-        history_list.sort(key=lambda x: x.get("last_used", 0), reverse=True)
+        history_list = [self._make_history_item(k, v) for k, v in history.items()]
+        history_list.sort(key=itemgetter("last_used"), reverse=True)
+        self._sorted_history_cache, self._sorted_history_dirty = history_list, False
         return history_list
 
     def _show_history_popup(self, event=None):
@@ -235,6 +359,7 @@ class PlayerApp:
         self.history_popup = popup = tk.Toplevel(self.root)
         popup.overrideredirect(True)
         popup.geometry(f"{width}x200+{x}+{y}")
+        self._click_bind_id = self.root.bind("<Button-1>", self._handle_root_click, add="+")
         s = ttk.Style()
         s.configure('Card.TFrame', background='white', borderwidth=1, relief='solid')
         s.configure('Link.TButton', anchor='w', borderwidth=0, padding=4)
@@ -254,6 +379,11 @@ class PlayerApp:
         ttk.Button(frame, text="詳細資料...", command=self._show_history_details_modal).pack(pady=5)
 
     def _hide_history_popup(self):
+        if self._click_bind_id:
+            self.root.unbind("<Button-1>")
+            # 可能正由該綁定呼叫中，延後釋放對應的 Tcl 指令
+            self.root.after_idle(self.root.deletecommand, self._click_bind_id)
+            self._click_bind_id = None
         if self.history_popup:
             self.history_popup.destroy()
             self.history_popup = None
@@ -288,8 +418,7 @@ class PlayerApp:
         for col in cols: tree.heading(col, text=col)
         tree.column("URL", width=450); tree.column("使用次數", width=80, anchor=tk.CENTER); tree.column("上次使用", width=150, anchor=tk.W)
         for item in history:
-            last_used_str = datetime.fromtimestamp(item['last_used']).strftime('%Y-%m-%d %H:%M:%S')
-            tree.insert("", tk.END, values=(item['url'], item['count'], last_used_str))
+            tree.insert("", tk.END, values=(item['url'], item['count'], item['last_used_str']))
         sb = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
         tree.configure(yscrollcommand=sb.set)
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -306,6 +435,7 @@ class PlayerApp:
             for url in urls_to_delete:
                 if url in current_history: del current_history[url]
             self.config.set("playlist_history", current_history)
+            self._sorted_history_dirty = True
             LOG.info("已從歷史紀錄中刪除 %d 個項目。", len(urls_to_delete))
             tree.delete(*selected_ids)
             on_selection_change(None)
@@ -320,10 +450,14 @@ class PlayerApp:
         tree.bind("<<TreeviewSelect>>", on_selection_change)
         tree.bind("<Double-1>", on_tree_double_click)
         
-    def _load_last_playlist_on_startup(self):
+    def _bootstrap_last_playlist(self):
+        """視窗建立後，在 UI 執行緒上建立歷史紀錄排序並載入上次的播放清單"""
+        # 歷史紀錄與其排序快取只在 UI 執行緒上讀寫；清單很小，排序成本可忽略
         history = self._get_sorted_playlist_history()
-        if history and self.url_entry and self.load_button:
-            last_url = history[0]['url']
+        self._apply_last_playlist(history[0]['url'] if history else None)
+
+    def _apply_last_playlist(self, last_url: Optional[str]):
+        if last_url and self.url_entry and self.load_button:
             LOG.info("在啟動時找到上次的播放清單: %s", last_url)
             self.url_entry.insert(0, last_url)
             self.load_button.invoke()
@@ -335,99 +469,234 @@ class PlayerApp:
         url = self.url_entry.get().strip()
         if not url: return messagebox.showerror("錯誤", "請輸入播放清單或影片連結")
         self._update_playlist_history(url)
+        self._load_generation += 1
         if (cached := self.playlist_cache.get(f"playlist::{url}")):
             LOG.info("從快取載入播放清單: %s", url)
             self.set_status("從快取載入播放清單...")
             self._on_playlist_loaded(cached, from_cache=True)
         else:
             self.set_status("正在從網路載入播放清單...")
-            self.async_worker.submit_coro(self._load_playlist_async(url))
+            self.async_worker.submit_coro(self._load_playlist_async(url, self._load_generation))
 
-    async def _load_playlist_async(self, url: str):
+    async def _load_playlist_async(self, url: str, gen: int):
+        def on_batch(urls: List[str], titles: List[str]):
+            self.root.after(0, self._on_playlist_batch, gen, urls, titles)
         try:
-            result = await self.async_worker.run_blocking(self._fetch_playlist_blocking, url)
-            self.root.after(0, self._on_playlist_loaded, result, url)
+            result = await self.async_worker.run_blocking(self._fetch_playlist_blocking, url, on_batch)
+            self.root.after(0, self._on_playlist_fetch_done, gen, url, result)
         except Exception as e:
-            self.root.after(0, self._on_playlist_load_failed, e)
-
-    def _fetch_playlist_blocking(self, url: str) -> Tuple[List[str], List[str]]:
-        ydl_opts = dict(self.ydl_opts_common, extract_flat=True, skip_download=True)
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl: info = ydl.extract_info(url, download=False)
-        entries, urls, titles = info.get('entries') or [], [], []
-        for e in entries:
-            if not (vid_id := e.get('id')): continue
+            if gen == self._load_generation:
+                self.root.after(0, self._on_playlist_load_failed, e)
+
+    def _get_ydl(self, key: str, opts: Dict[str, Any]) -> Any:
+        """取得 (必要時建立) 目前執行緒中對應 key 的長駐 YoutubeDL 實例"""
+        instances = getattr(self._ydl_local, 'instances', None)
+        if instances is None:
+            instances = self._ydl_local.instances = {}
+        if (ydl := instances.get(key)) is None:
+            ydl = instances[key] = yt_dlp.YoutubeDL(opts)
+            with self._ydl_all_lock: self._ydl_all.append(ydl)
+        return ydl
+
+    def _close_ydl_instances(self):
+        with self._ydl_all_lock:
+            for ydl in self._ydl_all:
+                with suppress(Exception): ydl.close()
+            self._ydl_all.clear()
+
+    def _fetch_playlist_blocking(self, url: str, on_batch=None) -> Tuple[List[str], List[str]]:
+        """取得播放清單；entries 以產生器逐頁讀取，每累積一批就透過 on_batch 交給 UI"""
+        ydl = self._get_ydl('flat', self._ydl_opts_flat)
+        urls: List[str] = []
+        titles: List[str] = []
+        # process=False 讓 entries 保持惰性，不必等整份清單解析完
+        info = ydl.extract_info(url, download=False, process=False)
+        for _ in range(3):  # 追隨轉址型結果 (例如帶 list= 的影片網址)
+            if info.get('_type') not in ('url', 'url_transparent') or not info.get('url'): break
+            info = ydl.extract_info(info['url'], download=False, process=False)
+        sent, batch_size = 0, self.PLAYLIST_FIRST_BATCH
+        for e in (info.get('entries') or ()):
+            if not e or not (vid_id := e.get('id')): continue
             urls.append(f"https://www.youtube.com/watch?v={vid_id}")
-            titles.append(e.get('title', '未命名影片'))
+            titles.append(e.get('title') or '未命名影片')
+            if on_batch and len(urls) - sent >= batch_size:
+                on_batch(urls[sent:], titles[sent:])
+                sent, batch_size = len(urls), self.PLAYLIST_BATCH
+        if on_batch and len(urls) > sent:
+            on_batch(urls[sent:], titles[sent:])
         if not urls and isinstance(info, dict) and (web_url := info.get('webpage_url')):
             urls.append(web_url); titles.append(info.get('title', '未命名影片'))
         return urls, titles
 
+    def _cache_in_background(self, func, *args):
+        """快取寫入會觸及 SQLite，從 UI 執行緒呼叫時交給背景執行緒"""
+        self.async_worker.submit_coro(self.async_worker.run_blocking(func, *args))
+
     def _on_playlist_loaded(self, result, url_for_cache: Optional[str] = None, from_cache: bool = False):
-        if url_for_cache: self.playlist_cache.set(f"playlist::{url_for_cache}", result)
-        self.playlist_urls, self.playlist_titles = result
+        if url_for_cache: self._cache_in_background(self.playlist_cache.set, f"playlist::{url_for_cache}", result)
+        urls, titles = result
+        if from_cache and list(urls) == self.playlist_urls and list(titles) == self.playlist_titles:
+            # 重新選取目前已顯示的清單：保留播放狀態與預取結果，不重建列表
+            self.set_status(f"已載入 {len(self.playlist_urls)} 首影片 (來自快取)")
+            return
+        self.playlist_urls, self.playlist_titles = list(urls), list(titles)
+        self._display_rows = [f"{i+1}. {title}" for i, title in enumerate(self.playlist_titles)]
         self.unavailable_indices.clear()
+        self._available = list(range(len(self.playlist_urls)))
+        self._prefetched.clear()
+        if self._unavail_flush_job:
+            self.root.after_cancel(self._unavail_flush_job)
+            self._unavail_flush_job = None
+        self._pending_unavail.clear()
         self.current_idx = None
-        self._refresh_listbox()
+        self._rebuild_listbox()
         self.set_status(f"已載入 {len(self.playlist_urls)} 首影片" + (" (來自快取)" if from_cache else ""))
 
+    def _on_playlist_batch(self, gen: int, urls: List[str], titles: List[str]):
+        if gen != self._load_generation: return
+        if self._streamed_generation != gen:
+            self._streamed_generation = gen
+            self._on_playlist_loaded((urls, titles))
+            self.set_status(f"已載入 {len(self.playlist_urls)} 首影片，繼續載入中...")
+        else:
+            self._append_playlist_entries(urls, titles)
+
+    def _append_playlist_entries(self, urls: List[str], titles: List[str]):
+        """將新批次附加到目前清單，只插入新的列而不重建整個列表"""
+        start = len(self.playlist_urls)
+        self.playlist_urls.extend(urls)
+        self.playlist_titles.extend(titles)
+        new_rows = [f"{i}. {title}" for i, title in enumerate(titles, start + 1)]
+        self._display_rows.extend(new_rows)
+        self._available.extend(range(start, start + len(urls)))
+        # 若整個列表仍待重建，新項目會一併繪製，這裡不需插入
+        if self.listbox and not self._ui_dirty['listbox']:
+            self.listbox.insert(tk.END, *new_rows)
+            self._rendered_rows.extend(new_rows)
+        self.set_status(f"已載入 {len(self.playlist_urls)} 首影片，繼續載入中...")
+
+    def _on_playlist_fetch_done(self, gen: int, url: str, result: Tuple[List[str], List[str]]):
+        if gen != self._load_generation: return
+        if self._streamed_generation != gen:
+            # 沒有透過批次送出任何項目 (例如單一影片)
+            return self._on_playlist_loaded(result, url)
+        self._cache_in_background(self.playlist_cache.set, f"playlist::{url}", result)
+        self.set_status(f"已載入 {len(self.playlist_urls)} 首影片")
+
     def _on_playlist_load_failed(self, error: Exception):
         messagebox.showerror("載入失敗", f"無法載入播放清單。\n錯誤: {error}")
         self.set_status("載入失敗")
 
-    def _refresh_listbox(self):
-        if not self.listbox: return
-        self.listbox.delete(0, tk.END)
-        for i, title in enumerate(self.playlist_titles):
-            self.listbox.insert(tk.END, f"{i+1}. {title}")
-        self._update_listbox_highlights()
+    def _rebuild_listbox(self):
+        """要求重建整個列表，只在播放清單內容改變時呼叫"""
+        self._ui_dirty['listbox'] = True
+        self._request_ui_flush()
+
+    def _apply_highlights_incremental(self, changed_indices: Iterable[Optional[int]]):
+        """要求更新指定列的顏色，實際繪製於下一次閒置時合併進行"""
+        self._ui_dirty['highlights'].update(i for i in changed_indices if i is not None)
+        self._request_ui_flush()
 
-    def _update_listbox_highlights(self):
+    def _render_listbox(self):
         if not self.listbox: return
-        for i in range(self.listbox.size()):
-            bg, fg = ("", "")
-            if i == self.current_idx:
-                bg, fg = self.color_playing_bg, self.color_playing_fg
-            elif i in self.unavailable_indices:
-                fg = self.color_unavailable_fg
-            self.listbox.itemconfig(i, bg=bg, fg=fg)
+        if self._rendered_rows != self._display_rows:
+            # 大量插入期間暫停捲軸同步，完成後只更新一次
+            self.listbox.config(yscrollcommand='')
+            self.listbox.delete(0, tk.END)
+            # 一次 insert 多筆只需一次 Tcl 呼叫
+            if self._display_rows: self.listbox.insert(tk.END, *self._display_rows)
+            self.listbox.config(yscrollcommand=self.listbox_scrollbar.set)
+            self.listbox_scrollbar.set(*self.listbox.yview())
+            self._rendered_rows = list(self._display_rows)
+            self._row_styles.clear()
+        # 只需處理先前有特殊樣式或現在需要標示的列
+        marked = set(self._row_styles) | self.unavailable_indices
+        if self.current_idx is not None: marked.add(self.current_idx)
+        self._render_highlights(marked)
+
+    def _render_highlights(self, changed_indices: Iterable[int]):
+        """只更新指定列的顏色，避免每次狀態變化都走訪整個列表"""
+        if not self.listbox: return
+        size = self.listbox.size()
+        itemconfig, current, unavailable = self.listbox.itemconfig, self.current_idx, self.unavailable_indices
+        playing, row_styles = (self.color_playing_bg, self.color_playing_fg), self._row_styles
+        for i in changed_indices:
+            if not (0 <= i < size): continue
+            if i == current:
+                style = playing
+            else:
+                style = ("", self.color_unavailable_fg if i in unavailable else "")
+            if row_styles.get(i, ("", "")) == style: continue
+            itemconfig(i, bg=style[0], fg=style[1])
+            if style == ("", ""): row_styles.pop(i, None)
+            else: row_styles[i] = style
 
     def play_index(self, idx: int):
-        if not self.vlc_player: return messagebox.showwarning("無法播放", "VLC 播放器尚未初始化。")
+        if not self.vlc_player: return self._warn_vlc_not_ready("VLC 播放器尚未初始化。")
         if not (0 <= idx < len(self.playlist_urls)): return
         if idx in self.unavailable_indices: return self.play_next(start_idx=idx)
+        if (cached := self._prefetched.pop(idx, None)) and time.time() - cached[2] < self._prefetch_ttl:
+            LOG.info("使用預取的串流: %s", cached[0])
+            return self._on_stream_info_ready(*cached, idx)
         title = self.playlist_titles[idx]
         self.set_status(f"({idx+1}/{len(self.playlist_urls)}) 正在取得串流: {title}")
         self.async_worker.submit_coro(self._get_stream_info_async(self.playlist_urls[idx], idx))
 
-    async def _get_stream_info_async(self, url: str, idx: int):
+    async def _get_stream_info_async(self, url: str, idx: int, fresh: bool = False):
         try:
-            result = await self.async_worker.run_blocking(self._get_stream_info_blocking, url)
+            result = await self.async_worker.run_blocking(self._get_stream_info_blocking, url, fresh)
             self.root.after(0, self._on_stream_info_ready, *result, idx)
         except Exception as e:
             self.root.after(0, self._on_stream_info_error, e, idx)
 
-    def _get_stream_info_blocking(self, url: str) -> Tuple[str, str]:
-        for fmt in ('bestaudio[ext=m4a]/bestaudio', 'bestaudio/best'):
-            try:
-                ydl_opts = dict(self.ydl_opts_common, format=fmt, skip_download=True)
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                title, stream_url = info.get('title', '無標題'), info.get('url')
-                if not stream_url:
-                    for f in info.get('formats', []):
-                        if f.get('url') and f.get('acodec') != 'none':
-                            stream_url = f['url']; break
-                if stream_url: return title, stream_url
-            except Exception as e:
-                LOG.warning("使用格式 '%s' 獲取串流失敗: %s", fmt, e)
-        raise RuntimeError(f"所有格式策略均無法為 {url} 獲取串流")
-
-    def _on_stream_info_ready(self, title: str, stream_url: str, idx: int):
+    def _get_stream_info_blocking(self, url: str, fresh: bool = False) -> Tuple[str, str, float]:
+        """回傳 (標題, 串流網址, 網址解析時間)；fresh=True 時略過快取重新解析"""
+        # 快取值包含解析時間，讓預取的有效期間能以網址的實際年齡計算 (舊格式的項目視為未命中)
+        if not fresh and (cached := self.stream_cache.get(f"stream::{url}")) and len(cached) == 3:
+            return tuple(cached)
+        # yt-dlp 的錯誤直接向上拋出，讓 _on_stream_info_error 能依訊息判斷是否為永久性錯誤
+        info = self._get_ydl('stream', self._ydl_opts_stream).extract_info(url, download=False)
+        title, stream_url = info.get('title', '無標題'), info.get('url')
+        if not stream_url:
+            for f in info.get('formats', []):
+                if f.get('url') and f.get('acodec') != 'none':
+                    stream_url = f['url']; break
+        if not stream_url:
+            raise RuntimeError(f"無法為 {url} 獲取串流")
+        result = (title, stream_url, time.time())
+        self.stream_cache.set(f"stream::{url}", result)
+        return result
+
+    def _on_stream_info_ready(self, title: str, stream_url: str, resolved_at: float, idx: int):
         self.set_status(f"正在播放: {title}")
+        self._playing, self._playback_started = (idx, self.playlist_urls[idx]), False
         self._start_play(stream_url)
-        self.current_idx = idx
-        self._update_listbox_highlights()
+        prev_idx, self.current_idx = self.current_idx, idx
+        self._apply_highlights_incremental((prev_idx, idx))
         if self.listbox: self.listbox.see(idx)
+        if (nxt := self._peek_next_index(idx)) is not None and nxt != idx and nxt not in self._prefetched:
+            nxt_url = self.playlist_urls[nxt]
+            if nxt_url not in self._prefetch_inflight:
+                self._prefetch_inflight.add(nxt_url)
+                self.async_worker.submit_coro(self._prefetch_stream_async(nxt_url, nxt))
+
+    async def _prefetch_stream_async(self, url: str, idx: int):
+        """在背景預先解析下一首的串流網址，讓曲目切換時不必等待 yt-dlp"""
+        try:
+            result = await self.async_worker.run_blocking(self._get_stream_info_blocking, url)
+            self.root.after(0, self._store_prefetched, url, idx, *result)
+        except Exception as e:
+            LOG.info("預取索引 %d 的串流失敗，播放時將重新取得: %s", idx, e)
+            self.root.after(0, self._prefetch_inflight.discard, url)
+
+    def _store_prefetched(self, url: str, idx: int, title: str, stream_url: str, resolved_at: float):
+        self._prefetch_inflight.discard(url)
+        # 預取期間播放清單可能已被重新載入
+        if idx < len(self.playlist_urls) and self.playlist_urls[idx] == url:
+            self._prefetched[idx] = (title, stream_url, resolved_at)
+            self._prefetched.move_to_end(idx)
+            # 使用者跳著播放時未用到的預取會累積，只保留最近的幾筆
+            while len(self._prefetched) > self._prefetch_max: self._prefetched.popitem(last=False)
 
     def _on_stream_info_error(self, error: Exception, idx: int):
         title = self.playlist_titles[idx]
@@ -437,18 +706,26 @@ class PlayerApp:
         if any(err in error_msg for err in permanent_errors):
             self.set_status(f"跳過不可用影片: {title}")
             self.unavailable_indices.add(idx)
-            self._refresh_listbox()
+            self._mark_unplayable(idx)
+            self._pending_unavail.add(idx)
+            if self._unavail_flush_job: self.root.after_cancel(self._unavail_flush_job)
+            self._unavail_flush_job = self.root.after(300, self._flush_unavail)
         else:
             self.set_status(f"暫時無法播放，跳過: {title}")
         self.root.after(200, lambda: self.play_next(start_idx=idx))
 
+    def _flush_unavail(self):
+        self._unavail_flush_job = None
+        self._apply_highlights_incremental(self._pending_unavail)
+        self._pending_unavail.clear()
+
     def _start_play(self, stream_url: str):
         if not (vlc and self.vlc_inst and self.vlc_player): return
         self.vlc_player.set_media(self.vlc_inst.media_new(stream_url))
         self.vlc_player.play()
 
     def toggle_play(self):
-        if not self.vlc_player: return messagebox.showwarning("無法播放", "VLC 尚未初始化。")
+        if not self.vlc_player: return self._warn_vlc_not_ready("VLC 尚未初始化。")
         if self.vlc_player.is_playing(): self.vlc_player.pause(); self.set_status("已暫停")
         else:
             if self.vlc_player.get_media(): self.vlc_player.play(); self.set_status("播放中")
@@ -457,20 +734,32 @@ class PlayerApp:
                 self.play_index(sel[0] if sel else 0)
 
     def play_random(self):
-        if not self.vlc_player: return messagebox.showwarning("無法播放", "VLC 尚未初始化。")
+        if not self.vlc_player: return self._warn_vlc_not_ready("VLC 尚未初始化。")
         if not self.playlist_urls: return
-        pool = [i for i in range(len(self.playlist_urls)) if i not in self.unavailable_indices]
-        if not pool: return
-        if len(pool) > 1 and self.current_idx in pool: pool.remove(self.current_idx)
-        self.play_index(random.choice(pool))
+        pool = self._available
+        if not (n := len(pool)): return
+        pos = bisect_left(pool, self.current_idx) if self.current_idx is not None else n
+        if n > 1 and pos < n and pool[pos] == self.current_idx:
+            # 從其餘 n-1 首中均勻抽取 (跳過正在播放的位置)，不必複製並移除整個清單
+            j = random.randrange(n - 1)
+            pick = pool[j + 1 if j >= pos else j]
+        else:
+            pick = pool[random.randrange(n)]
+        self.play_index(pick)
+
+    def _peek_next_index(self, start: Optional[int]) -> Optional[int]:
+        """回傳 start 之後第一個可播放的索引，不實際播放"""
+        if not self._available: return None
+        pos = bisect_right(self._available, -1 if start is None else start)
+        return self._available[pos % len(self._available)]
+
+    def _mark_unplayable(self, idx: int):
+        pos = bisect_left(self._available, idx)
+        if pos < len(self._available) and self._available[pos] == idx: del self._available[pos]
 
     def play_next(self, start_idx: Optional[int] = None):
-        if not self.playlist_urls: return
-        num = len(self.playlist_urls)
         start = self.current_idx if start_idx is None else start_idx
-        for i in range(1, num + 1):
-            next_idx = (start + i) % num
-            if next_idx not in self.unavailable_indices: return self.play_index(next_idx)
+        if (next_idx := self._peek_next_index(start)) is not None: return self.play_index(next_idx)
 
     def _on_list_double(self):
         if self.listbox and (sel := self.listbox.curselection()): self.play_index(sel[0])
@@ -480,30 +769,99 @@ class PlayerApp:
             LOG.warning("python-vlc 模組或 VLC 主程式未找到。")
             messagebox.showwarning("VLC 未就緒", "找不到 VLC Media Player。\n請確認您已安裝，否則播放功能將無法使用。")
             return
+        # vlc.Instance 會載入 DLL 並掃描外掛，放到背景執行以免凍結視窗
+        self._vlc_init_pending = True
+        self.root.bind('<<VLCEnd>>', lambda e: self._on_vlc_end_main())
+        self.root.bind('<<VLCError>>', lambda e: self._on_stream_playback_failed())
+        self.async_worker.submit_coro(self._init_vlc_async())
+
+    async def _init_vlc_async(self):
+        cache = int(self.config.get('cache_ms', 5000))
         try:
-            cache = int(self.config.get('cache_ms', 5000))
-            self.vlc_inst = vlc.Instance(f'--network-caching={cache}', '--no-video')
-            self.vlc_player = self.vlc_inst.media_player_new()
-            em = self.vlc_player.event_manager()
-            em.event_attach(vlc.EventType.MediaPlayerEndReached, self._on_vlc_end)
-            LOG.info("VLC 初始化成功 (網路快取 %d ms)", cache)
+            inst, player = await self.async_worker.run_blocking(self._init_vlc_blocking, cache)
+            self.root.after(0, self._on_vlc_ready, inst, player, cache)
         except Exception as e:
             LOG.exception("VLC 初始化失敗")
-            messagebox.showerror("VLC 錯誤", f"VLC 播放器初始化失敗。\n錯誤: {e}\n請確保 VLC 安裝正確。")
-            self.vlc_player = self.vlc_inst = None
+            self.root.after(0, self._on_vlc_init_failed, e)
+
+    def _init_vlc_blocking(self, cache: int) -> Tuple[Any, Any]:
+        inst = vlc.Instance(f'--network-caching={cache}', '--no-video')
+        player = inst.media_player_new()
+        em = player.event_manager()
+        em.event_attach(vlc.EventType.MediaPlayerEndReached, self._on_vlc_end)
+        em.event_attach(vlc.EventType.MediaPlayerEncounteredError, self._on_vlc_error)
+        em.event_attach(vlc.EventType.MediaPlayerTimeChanged, self._on_vlc_time_changed)
+        return inst, player
+
+    def _on_vlc_ready(self, inst: Any, player: Any, cache: int):
+        self._vlc_init_pending = False
+        self.vlc_inst, self.vlc_player = inst, player
+        LOG.info("VLC 初始化成功 (網路快取 %d ms)", cache)
+
+    def _on_vlc_init_failed(self, error: Exception):
+        self._vlc_init_pending = False
+        self.vlc_player = self.vlc_inst = None
+        messagebox.showerror("VLC 錯誤", f"VLC 播放器初始化失敗。\n錯誤: {error}\n請確保 VLC 安裝正確。")
+
+    def _warn_vlc_not_ready(self, message: str):
+        if self._vlc_init_pending: message = "VLC 初始化中，請稍候…"
+        messagebox.showwarning("無法播放", message)
 
     def _on_vlc_end(self, event):
+        """於 libvlc 執行緒中觸發：只做防抖，再以虛擬事件把後續工作交給 Tk 執行緒"""
+        self._post_vlc_event('<<VLCEnd>>')
+
+    def _on_vlc_error(self, event):
+        self._post_vlc_event('<<VLCError>>')
+
+    def _on_vlc_time_changed(self, event):
+        # 於 libvlc 執行緒中頻繁觸發，只設定旗標
+        self._playback_started = True
+
+    def _post_vlc_event(self, sequence: str):
+        # 出錯時 libvlc 可能接著送出 EndReached，兩者共用防抖
         now = time.time()
         if (now - self._last_end_event_time) < self._end_debounce_sec: return
         self._last_end_event_time = now
+        self.root.event_generate(sequence, when='tail')
+
+    def _on_vlc_end_main(self):
+        if not self._playback_started:
+            # 還沒播放就結束：多半是快取或預取的串流網址已失效
+            return self._on_stream_playback_failed()
+        self._stream_retry_idx = None
         LOG.info("索引 %s 播放完畢", self.current_idx)
-        self.root.after(250, self.play_next)
+        # 防抖已由 _on_vlc_end 負責，這裡不再額外延遲；若下一首已預取會直接開始播放
+        self.play_next()
+
+    def _on_stream_playback_failed(self):
+        """VLC 無法播放取得的串流網址：略過快取重新解析一次 (並覆寫快取)，仍失敗則移除快取並跳到下一首"""
+        if not self._playing: return
+        idx, url = self._playing
+        self._playing = None
+        if idx >= len(self.playlist_urls) or self.playlist_urls[idx] != url: return
+        if self._stream_retry_idx != idx:
+            self._stream_retry_idx = idx
+            LOG.warning("索引 %d 的串流無法播放，網址可能已過期，重新取得中。", idx)
+            self.set_status(f"串流網址已失效，重新取得: {self.playlist_titles[idx]}")
+            self.async_worker.submit_coro(self._get_stream_info_async(url, idx, fresh=True))
+            return
+        LOG.error("索引 %d 的串流重新取得後仍無法播放，改播下一首。", idx)
+        self._stream_retry_idx = None
+        self._cache_in_background(self.stream_cache.invalidate, f"stream::{url}")
+        self.play_next()
 
     def _quit_gracefully(self):
         LOG.info("正在關閉應用程式...")
         with suppress(Exception): 
             if self.vlc_player: self.vlc_player.stop()
         with suppress(Exception): self.async_worker.stop()
+        with suppress(Exception): self._close_ydl_instances()
         with suppress(Exception): self.log_viewer.close()
+        # 先停止背景工作，避免尚未開始的更新檢查在設定檔關閉後才寫入
+        with suppress(Exception): BG_EXEC.shutdown(wait=False, cancel_futures=True)
+        with suppress(Exception): self.config.close()
+        with suppress(Exception): self.playlist_cache.close()
+        with suppress(Exception): self.stream_cache.close()
         self.root.destroy()
 
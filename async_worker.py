@@ -1,9 +1,14 @@
 # async_worker.py
-import threading, asyncio
+import threading, asyncio, functools, queue
+from concurrent.futures import Executor, Future
+from contextlib import suppress
 
 class AsyncWorker:
-    def __init__(self):
+    def __init__(self, max_workers: int = 8):
         self.loop = None
+        # yt-dlp 的擷取皆為 I/O 密集，使用專用執行緒池以免與其他工作搶用預設 executor；
+        # 工作執行緒為 daemon，關閉程式時不必等待仍在進行的擷取或預取
+        self.executor = BackgroundExecutor(max_workers=max_workers, thread_name_prefix='ytdl')
         self._thread = threading.Thread(target=self._start_loop, daemon=True)
         self._started = threading.Event()
         self._thread.start()
@@ -31,10 +36,72 @@ class AsyncWorker:
         return asyncio.run_coroutine_threadsafe(coro, self.loop)
 
     async def run_blocking(self, func, *args, **kwargs):
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+        # 只會在 submit_coro 排入 self.loop 的協程中呼叫，因此 self.loop 即為執行中的迴圈
+        if kwargs:
+            return await self.loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        # 常見情況只有位置參數，直接交給 executor 即可，不必額外包裝
+        return await self.loop.run_in_executor(self.executor, func, *args)
 
     def stop(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
         if self.loop:
             self.loop.call_soon_threadsafe(self.loop.stop)
             self._thread.join(timeout=1)
+
+
+class BackgroundExecutor(Executor):
+    """工作執行緒為 daemon 的執行緒池
+
+    ThreadPoolExecutor 的工作執行緒會在直譯器結束時被等待，仍在進行的網路請求 (yt-dlp 擷取、更新檢查) 會拖住程式關閉；
+    這裡的執行緒不會被等待。
+    """
+    def __init__(self, max_workers: int = 2, thread_name_prefix: str = "ytplayer-bg"):
+        self._tasks: queue.SimpleQueue = queue.SimpleQueue()
+        self._shutdown = False
+        self._shutdown_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{thread_name_prefix}_{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _run(self):
+        while (task := self._tasks.get()) is not None:
+            future, func, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, func, /, *args, **kwargs) -> Future:
+        with self._shutdown_lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            future: Future = Future()
+            self._tasks.put((future, func, args, kwargs))
+            return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        """停止接受新工作；cancel_futures=True 時取消尚未開始的工作，wait=True 時等待執行中的工作結束"""
+        with self._shutdown_lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            if cancel_futures:
+                with suppress(queue.Empty):
+                    while (task := self._tasks.get_nowait()) is not None:
+                        task[0].cancel()
+            for _ in self._threads:
+                self._tasks.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+
+
+# 全程式共用的背景執行緒池 (更新檢查等零星工作)
+BG_EXEC = BackgroundExecutor(max_workers=2, thread_name_prefix="ytplayer-bg")
@@ -3,22 +3,58 @@ import threading
 import time
 import json
 import os
+import sqlite3
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Set, Tuple
 import logging
 
+# 嘗試匯入 orjson (序列化速度遠快於標準 json)，不可用時退回標準函式庫
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 LOG = logging.getLogger("ytplayer.cache")
 
+
+def _dumps(obj: Any) -> bytes:
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
 class SmartCacheManager:
-    def __init__(self, app_name: str = "ytplayer", cache_file: str = "cache.json", max_size: int = 400, default_ttl: int = 60*60):
+    """以 SQLite 保存的 LRU 快取：每個項目獨立一列，讀寫只觸及被存取的 key，不必在啟動時載入整份快取
+
+    最近存取的 hot_size 個項目另外保留在記憶體中 (已解碼)，命中時不查詢資料庫，也不必等待背景 set() 持有的 lock。
+    get() 只做查詢；存取時間與過期項目的刪除先記在記憶體中，於下次 set() 或 close() 時一併寫入。
+    set() 會寫入資料庫，UI 執行緒上的呼叫端應交給背景執行緒執行。
+    鎖內不記錄日誌：日誌處理器可能等待 UI 執行緒，而 UI 執行緒可能正在等這把鎖。
+    """
+
+    def __init__(self, app_name: str = "ytplayer", cache_file: str = "cache.db", max_size: int = 400, default_ttl: int = 60*60,
+                 hot_size: int = 16):
         self.app_name = app_name
         self.cache_file = cache_file
         self.path = self._get_cache_path()
-        self.store: Dict[str, Dict[str, Any]] = {}
         self.max_size = max_size
         self.default_ttl = default_ttl
+        # 同一個連線會被 UI 執行緒與背景執行緒共用，以 lock 序列化存取
         self.lock = threading.Lock()
-        self._load()
+        self.conn: Optional[sqlite3.Connection] = None
+        # 記憶體層與待寫入的存取時間由 _hot_lock 保護；需要兩把鎖時一律先取 lock 再取 _hot_lock
+        self._hot_lock = threading.Lock()
+        self._hot: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()  # key -> (value, expires_at)
+        self.hot_size = hot_size
+        self._touched: Dict[str, float] = {}  # key -> 尚未寫入的 last_used
+        self._expired: Set[str] = set()       # 讀取時發現已過期、尚未刪除的 key
+        self._open()
+        self._remove_legacy_files()
 
     def _get_cache_path(self) -> Path:
         """取得快取檔案的路徑，與 config.py 的邏輯保持一致"""
@@ -30,83 +66,201 @@ class SmartCacheManager:
         cache_dir.mkdir(parents=True, exist_ok=True)
         return cache_dir / self.cache_file
 
-    def _load(self):
-        """從檔案載入快取資料"""
+    def _open(self):
+        """開啟 (必要時建立) 快取資料庫"""
+        error = None
         with self.lock:
             try:
-                if self.path.exists():
-                    with open(self.path, 'r', encoding='utf-8') as f:
-                        self.store = json.load(f)
-                        LOG.info("已從 %s 載入永續性快取。", self.path)
-            except (json.JSONDecodeError, IOError) as e:
-                LOG.warning("載入快取檔案失敗 (%s)，將使用空快取。", e)
-                self.store = {}
-
-    def _save(self):
-        """將目前的快取資料儲存到檔案"""
-        # 這個函式總是在 lock 保護下被呼叫
-        try:
-            with open(self.path, 'w', encoding='utf-8') as f:
-                json.dump(self.store, f, ensure_ascii=False, indent=2)
-        except IOError as e:
-            LOG.error("儲存快取檔案失敗: %s", e)
+                # isolation_level=None：每個陳述式自動提交，WAL 模式下提交不需等待 fsync
+                self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute("PRAGMA synchronous=NORMAL")
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, created REAL, last_used REAL)"
+                )
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON cache(last_used)")
+            except sqlite3.Error as e:
+                error, self.conn = e, None
+        if error:
+            LOG.warning("開啟快取資料庫失敗 (%s)，將停用快取。", error)
+        else:
+            LOG.info("已開啟永續性快取 %s。", self.path)
+
+    def _remove_legacy_files(self):
+        """刪除改用 SQLite 前遺留的 JSON 快取檔；內容都是短效期資料，不值得轉移"""
+        stem = Path(self.cache_file).stem
+        for name in (f"{stem}.json", f"{stem}.json.tmp", f"{stem}.json.gz", f"{stem}.json.gz.tmp"):
+            legacy = self.path.with_name(name)
+            try:
+                legacy.unlink()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                LOG.warning("無法刪除舊的快取檔 %s: %s", legacy, e)
+            else:
+                LOG.info("已刪除舊的快取檔 %s。", legacy)
 
     def get(self, key: str) -> Optional[Any]:
-        """從快取中取得資料，若資料過期則移除"""
+        """從快取中取得資料；先查記憶體層，未命中才查詢資料庫 (不寫入)"""
+        now = time.time()
+        with self._hot_lock:
+            if (hit := self._hot.get(key)) is not None:
+                value, expires_at = hit
+                if expires_at is None or now <= expires_at:
+                    self._hot.move_to_end(key)
+                    self._touched[key] = now
+                    return value
+                del self._hot[key]
+
+        row = error = None
+        expired = False
         with self.lock:
-            entry = self.store.get(key)
-            if not entry:
+            if not self.conn:
                 return None
-            
-            # 檢查是否過期
-            if entry.get('expires_at') is not None and time.time() > entry['expires_at']:
-                LOG.info("快取項目 '%s' 已過期，將其移除。", key)
-                self.store.pop(key, None)
-                self._save() # 移除過期項目後儲存變更
-                return None
-            
-            entry['hit'] = entry.get('hit', 0) + 1
-            return entry.get('value')
+            try:
+                row = self.conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row and row[1] is not None and now > row[1]:
+                    # 已過期
+                    expired, row = True, None
+                    self._expired.add(key)
+            except sqlite3.Error as e:
+                error, row = e, None
+        if expired:
+            LOG.info("快取項目 '%s' 已過期，將其移除。", key)
+        if row is None:
+            if error:
+                LOG.warning("讀取快取項目 '%s' 失敗: %s", key, error)
+            return None
+        try:
+            value = _loads(row[0])
+        except ValueError as e:
+            LOG.warning("讀取快取項目 '%s' 失敗: %s", key, e)
+            return None
+        self._remember(key, value, row[1], now)
+        return value
+
+    def _remember(self, key: str, value: Any, expires_at: Optional[float], now: float):
+        """放入記憶體層並記下存取時間"""
+        with self._hot_lock:
+            self._touched[key] = now
+            if self.hot_size <= 0:
+                return
+            self._hot[key] = (value, expires_at)
+            self._hot.move_to_end(key)
+            while len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+
+    def _forget(self, key: Optional[str] = None):
+        """自記憶體層移除單一項目 (key=None 時全部移除)"""
+        with self._hot_lock:
+            if key is None:
+                self._hot.clear()
+                self._touched.clear()
+            else:
+                self._hot.pop(key, None)
+                self._touched.pop(key, None)
 
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """將資料存入快取，並檢查是否超出大小限制"""
+        ttl_eff = ttl if ttl is not None else self.default_ttl
+        try:
+            payload = _dumps(value)
+        except TypeError as e:
+            LOG.error("寫入快取項目 '%s' 失敗: %s", key, e)
+            return
+        evicted = (0, 0)
+        error = None
         with self.lock:
-            ttl_eff = ttl if ttl is not None else self.default_ttl
-            self.store[key] = {
-                'value': value,
-                'created': time.time(),
-                'expires_at': (time.time() + ttl_eff) if ttl_eff > 0 else None,
-                'hit': 0
-            }
-            if len(self.store) > self.max_size:
-                self._evict_one()
-            self._save() # 每次設定新值後都儲存
-
-    def _evict_one(self):
-        """根據 LFU/LRU 策略移除一個快取項目"""
+            if not self.conn:
+                return
+            now = time.time()
+            expires_at = (now + ttl_eff) if ttl_eff > 0 else None
+            try:
+                self._flush_pending(now)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, expires_at, now, now),
+                )
+                evicted = self._evict_lru(now)
+            except sqlite3.Error as e:
+                error = e
+            else:
+                # 仍在 lock 內更新記憶體層，避免與同一 key 的 invalidate() 交錯
+                self._remember(key, value, expires_at, now)
+        if error:
+            LOG.error("寫入快取項目 '%s' 失敗: %s", key, error)
+        expired, lru = evicted
+        if expired:
+            LOG.info("因快取已滿，清除了 %d 個過期項目。", expired)
+        if lru:
+            LOG.info("快取已滿，移除了 %d 個最久未使用的項目。", lru)
+
+    def _flush_pending(self, now: float):
+        """將累積的存取時間與過期刪除一次寫入"""
         # 這個函式總是在 lock 保護下被呼叫
-        now = time.time()
-        
-        # 優先移除已過期的項目
-        expired_keys = [k for k, v in self.store.items() if v.get('expires_at') and v['expires_at'] < now]
-        if expired_keys:
-            for k in expired_keys:
-                self.store.pop(k, None)
-            LOG.info("因快取已滿，清除了 %d 個過期項目。", len(expired_keys))
-            return
+        if self._expired:
+            self.conn.executemany(
+                "DELETE FROM cache WHERE key = ? AND expires_at IS NOT NULL AND expires_at < ?",
+                [(key, now) for key in self._expired])
+            self._expired.clear()
+        with self._hot_lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            self.conn.executemany(
+                "UPDATE cache SET last_used = ? WHERE key = ?", [(ts, key) for key, ts in touched.items()])
+
+    def _evict_lru(self, now: float) -> Tuple[int, int]:
+        """超出大小限制時，先清除過期項目，再依 LRU 策略移除最久未使用的項目；回傳 (過期, LRU) 移除數"""
+        # 這個函式總是在 lock 保護下被呼叫
+        excess = self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_size
+        if excess <= 0:
+            return 0, 0
+        expired = self.conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,)).rowcount
+        excess -= max(expired, 0)
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_used LIMIT ?)", (excess,))
+        return max(expired, 0), max(excess, 0)
+
+    def _execute(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Error]:
+        # 這個函式總是在 lock 保護下被呼叫；錯誤交由呼叫端在釋放 lock 後記錄
+        if not self.conn:
+            return None
+        try:
+            self.conn.execute(sql, params)
+        except sqlite3.Error as e:
+            return e
+        return None
 
-        # 若空間仍然不足，則根據點擊數(hit)和創建時間(created)來淘汰
-        if len(self.store) > self.max_size:
-            # 排序策略：優先淘汰點擊數最少的，若點擊數相同則淘汰最舊的
-            items = [(k, v.get('hit', 0), v.get('created', 0)) for k, v in self.store.items()]
-            items.sort(key=lambda x: (x[1], x[2])) 
-            if items:
-                key_to_evict = items[0][0]
-                self.store.pop(key_to_evict, None)
-                LOG.info("快取已滿，依據淘汰策略移除項目: %s", key_to_evict)
+    def invalidate(self, key: str):
+        """移除單一快取項目"""
+        with self.lock:
+            self._forget(key)
+            error = self._execute("DELETE FROM cache WHERE key = ?", (key,))
+        if error:
+            LOG.error("快取資料庫操作失敗: %s", error)
 
     def clear(self):
         """清空所有快取"""
         with self.lock:
-            self.store.clear()
-            self._save()
+            self._forget()
+            self._expired.clear()
+            error = self._execute("DELETE FROM cache")
+        if error:
+            LOG.error("快取資料庫操作失敗: %s", error)
+
+    def close(self):
+        """寫入累積的存取時間並關閉資料庫連線 (於程式結束時呼叫)"""
+        error = None
+        with self.lock:
+            if self.conn:
+                try:
+                    self._flush_pending(time.time())
+                    self.conn.close()
+                except sqlite3.Error as e:
+                    error = e
+                self.conn = None
+        if error:
+            LOG.error("關閉快取資料庫失敗: %s", error)
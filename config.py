@@ -1,18 +1,41 @@
 # config.py
 from __future__ import annotations
-import json, os
+import json, os, queue, threading, time
+from contextlib import suppress
 from pathlib import Path
 from typing import Dict, Any
 import logging
 
+# 嘗試匯入 orjson 加速設定檔的讀寫，不可用時退回標準函式庫
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 LOG = logging.getLogger("ytplayer.config")
 
+
+def _dumps(obj: Any) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
 class ConfigManager:
-    def __init__(self, app_name: str = "ytplayer"):
+    def __init__(self, app_name: str = "ytplayer", flush_delay: float = 0.5):
         self.app_name = app_name
         self.path = self._get_config_path()
         self.data: Dict[str, Any] = {}
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()        # 保護 data 與 _dirty
+        self._write_lock = threading.Lock()  # 確保寫檔依序進行
+        self._dirty = False
+        self._closed = False
+        self._unsynced = False               # 最後一次寫檔是否尚未 fsync
+        self._mtime = 0.0                    # 最後一次讀取或寫入時設定檔的 mtime
+        self._write_queue: queue.Queue = queue.Queue()
         self._load()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
 
     def _get_config_path(self) -> Path:
         if os.name == "nt":
@@ -23,25 +46,124 @@ class ConfigManager:
         cfg_dir.mkdir(parents=True, exist_ok=True)
         return cfg_dir / "config.json"
 
-    def _load(self):
+    def _stat_mtime(self) -> float:
         try:
-            if self.path.exists():
-                with open(self.path, 'r', encoding='utf-8') as f:
-                    self.data = json.load(f)
+            return self.path.stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def _read(self):
+        """讀取並解析設定檔，回傳 (data, mtime)；失敗時 data 為 None"""
+        try:
+            if not self.path.exists():
+                return {}, 0.0
+            mtime = self._stat_mtime()
+            raw = self.path.read_bytes()
+            return (orjson.loads(raw) if orjson else json.loads(raw)), mtime
         except Exception:
             LOG.exception("Failed to load config")
-            self.data = {}
+            return None, 0.0
+
+    def _load(self):
+        data, self._mtime = self._read()
+        self.data = data if data is not None else {}
+
+    def reload_if_changed(self) -> bool:
+        """設定檔在外部被修改 (mtime 改變) 時才重新解析；有尚未寫入的變更時不覆蓋。回傳是否已重新載入"""
+        if self._stat_mtime() == self._mtime or self._dirty:
+            return False
+        # 在鎖外讀取解析 (失敗時會記錄日誌)，再於鎖內確認期間沒有新的變更後替換
+        data, mtime = self._read()
+        if data is None:
+            return False
+        with self._lock:
+            if self._dirty:
+                return False
+            self.data, self._mtime = data, mtime
+        return True
+
+    def _writer_loop(self):
+        """背景寫入執行緒：收到請求後等待 flush_delay，將期間的所有變更合併為一次寫檔；收到 None 時結束"""
+        while True:
+            if self._write_queue.get() is None:
+                return
+            time.sleep(self.flush_delay)
+            stop = False
+            with suppress(queue.Empty):
+                while True:
+                    if self._write_queue.get_nowait() is None:
+                        stop = True
+            self.flush()
+            if stop:
+                return
+
+    def _write_atomic(self, payload: bytes, durable: bool = False):
+        """先寫入同目錄的暫存檔再以 os.replace 取代，寫到一半當機也不會損毀設定檔"""
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            if durable:
+                # 頻繁的一般寫入不做 fsync，避免對 SSD 造成大量小寫入
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._unsynced = not durable
+        # 記下自己寫入後的 mtime，reload_if_changed 才不會把自己的寫入當成外部修改
+        self._mtime = self._stat_mtime()
+
+    def flush(self, critical: bool = False):
+        """若有尚未寫入的變更，立即寫入檔案；critical=True 時確保內容 (包含先前未 fsync 的寫入) 已落盤"""
+        # 鎖內不記錄日誌：日誌處理器可能等待 UI 執行緒，而 UI 執行緒可能正在等這些鎖
+        error = None
+        with self._write_lock:
+            with self._lock:
+                payload = None
+                if self._dirty:
+                    try:
+                        payload = _dumps(self.data)
+                    except Exception as e:
+                        error = ("Failed to serialize config", e)
+                    else:
+                        self._dirty = False
+            try:
+                if payload is not None:
+                    self._write_atomic(payload, durable=critical)
+                elif critical and self._unsynced and error is None:
+                    # 沒有新變更，但最後一次一般寫入尚未落盤
+                    with open(self.path, 'rb') as f:
+                        os.fsync(f.fileno())
+                    self._unsynced = False
+            except Exception as e:
+                error = ("Failed to save config", e)
+        if error:
+            LOG.error("%s", error[0], exc_info=error[1])
 
     def save(self):
-        try:
-            with open(self.path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-        except Exception:
-            LOG.exception("Failed to save config")
+        """立即寫入尚未儲存的變更；沒有變更時不做任何事"""
+        if not self._dirty:
+            return
+        self.flush()
+
+    def close(self):
+        """以 fsync 寫入剩餘變更並結束背景寫入執行緒 (於程式結束時呼叫)"""
+        self._closed = True
+        # 先在此執行緒完成可靠的寫入，背景執行緒醒來後不會再有待寫入的變更
+        self.flush(critical=True)
+        self._write_queue.put_nowait(None)
+        self._writer.join(timeout=self.flush_delay + 1)
+        # 背景執行緒可能在上面兩步之間以一般方式寫過檔，再確保一次落盤
+        self.flush(critical=True)
 
     def get(self, key: str, default=None):
         return self.data.get(key, default)
 
     def set(self, key: str, value):
-        self.data[key] = value
-        self.save()
+        """設定值並交由背景執行緒延遲寫檔；flush_delay 內的多次設定只會寫一次檔"""
+        with self._lock:
+            self.data[key] = value
+            self._dirty = True
+        if self._closed:
+            # 背景寫入執行緒已結束 (例如關閉程式時仍在執行的背景工作)，直接寫檔以免遺失
+            self.flush(critical=True)
+        else:
+            self._write_queue.put_nowait(key)
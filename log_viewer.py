@@ -3,46 +3,92 @@ from __future__ import annotations
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import logging
+import logging.handlers
 import queue
+import itertools
+from collections import deque
+from contextlib import suppress
 from datetime import datetime
 import json
-from typing import List, Dict, Any, Optional
-
-class TkinterLogHandler(logging.Handler):
-    """一個將日誌記錄發送到 GUI 佇列的 logging handler"""
-    def __init__(self, log_queue: queue.Queue):
-        super().__init__()
-        self.log_queue = log_queue
-
-    def emit(self, record: logging.LogRecord):
-        # 格式化日誌記錄並放入佇列
-        msg = self.format(record)
-        log_entry = {
-            'timestamp': datetime.fromtimestamp(record.created),
-            'level': record.levelname,
-            'source': record.name,
-            'message': msg,
-            'detail': f"檔案: {record.pathname}\n行號: {record.lineno}\n函式: {record.funcName}",
-        }
-        self.log_queue.put(log_entry)
+from operator import itemgetter
+from typing import Deque, Dict, Any, Iterable, List, Optional, Callable
+
+# 嘗試匯入 orjson 加速大量日誌的匯出，不可用時退回標準函式庫
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Treeview 每列的欄位值 (時間、級別、來源、訊息第一行)
+_ROW_VALUES = itemgetter('_ts_str', 'level', 'source', '_msg_first_line')
+
+class TkinterLogHandler(logging.handlers.QueueHandler):
+    """一個將日誌記錄發送到 GUI 佇列的 logging handler
+
+    呼叫端執行緒只負責把 LogRecord 原樣放入佇列；格式化與組裝顯示資料都延到 LogViewer 在 Tk 執行緒上處理。
+    """
+    def __init__(self, log_queue: queue.Queue, on_record: Optional[Callable[[], None]] = None):
+        super().__init__(log_queue)
+        self.on_record = on_record  # 放入佇列後呼叫，用來喚醒 GUI 處理
+
+    def handle(self, record: logging.LogRecord):
+        # 不取得 handler 自身的鎖：queue 本身是執行緒安全的，而 on_record 可能等待 Tk 執行緒；
+        # 若持鎖等待，Tk 執行緒同時記錄日誌時會卡在同一把鎖上而死鎖
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return rv
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 佇列只在本行程內使用，不需像預設實作那樣先格式化並移除 args/exc_info
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.put_nowait(record)
+        if self.on_record:
+            self.on_record()
 
 class LogViewer(tk.Toplevel):
     """一個顯示應用程式日誌的獨立視窗"""
-    def __init__(self, parent):
+    DEFAULT_MAX_RECORDS = 10000
+
+    def __init__(self, parent, max_records: int = DEFAULT_MAX_RECORDS):
         super().__init__(parent)
         self.title("應用程式日誌")
         self.geometry("800x500")
         self.withdraw() # 預設隱藏
 
-        self.log_records: List[Dict[str, Any]] = []
+        # 環狀緩衝區：只保留最近 max_records 筆，長時間執行也不會無限成長
+        self.max_records = max_records
+        self.log_records: Deque[Dict[str, Any]] = deque(maxlen=max_records)
+        # 每筆日誌有唯一遞增的 id，同時作為 Treeview 的 iid，選取時可直接查回原始記錄
+        self.log_records_by_id: Dict[int, Dict[str, Any]] = {}
+        self._record_ids = itertools.count()
         self.log_queue = queue.Queue()
+        self.formatter = logging.Formatter('%(message)s')
         self.after_id: Optional[str] = None
+        self._filter_after_id: Optional[str] = None
+        self._drain_pending = False
+        self._tree_stale = False  # 視窗隱藏期間只收集記錄，Treeview 待顯示時再重建
+        # 虛擬列表：_view 為符合篩選條件的記錄，Treeview 只保留可視範圍內的列
+        self._view: List[Dict[str, Any]] = []
+        self._viewport_first = 0
+        self._viewport_count = 50
+        self._rendered_iids: List[str] = []
+        # 選取的列捲出可視範圍時會被刪除，記下其 iid 以便再次顯示時恢復選取
+        self._selected_iid: Optional[str] = None
+        self._detail_iid: Optional[str] = None  # 詳細資訊目前顯示的記錄
 
         self._build_ui()
         self.protocol("WM_DELETE_WINDOW", self.toggle_visibility) # 點擊關閉按鈕時隱藏而非銷毀
         
-        # 開始定期檢查佇列
-        self._process_log_queue()
+        # 新日誌以虛擬事件喚醒處理，另保留低頻率輪詢作為備援
+        self.bind("<<NewLogRecord>>", self._drain_queue)
+        self.bind("<Map>", self._on_map)
+        self._poll_log_queue()
 
     def _build_ui(self):
         # --- 主要框架 ---
@@ -81,7 +127,7 @@ class LogViewer(tk.Toplevel):
         # 搜尋
         ttk.Label(frame, text="搜尋:").pack(side=tk.LEFT)
         self.search_var = tk.StringVar()
-        self.search_var.trace_add("write", lambda *args: self._apply_filters())
+        self.search_var.trace_add("write", lambda *args: self._schedule_filter())
         search_entry = ttk.Entry(frame, textvariable=self.search_var, width=20)
         search_entry.pack(side=tk.LEFT, padx=5)
 
@@ -113,11 +159,20 @@ class LogViewer(tk.Toplevel):
         self.tree.tag_configure("CRITICAL", foreground="red", font=("", 9, "bold"))
         
         self.tree.bind("<<TreeviewSelect>>", self._on_log_select)
+        # 垂直捲動改由 _view 驅動，Treeview 本身只有可視範圍的列
+        self.tree.bind("<Configure>", self._on_tree_configure)
+        self.tree.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_units(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_units(3))
+        self.tree.bind("<Up>", lambda e: self._on_arrow_key(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow_key(1))
+        self.tree.bind("<Prior>", lambda e: self._on_vscroll("scroll", -1, "pages"))
+        self.tree.bind("<Next>", lambda e: self._on_vscroll("scroll", 1, "pages"))
 
         # 捲軸
-        vsb = ttk.Scrollbar(frame, orient="vertical", command=self.tree.yview)
+        self.vsb = vsb = ttk.Scrollbar(frame, orient="vertical", command=self._on_vscroll)
         hsb = ttk.Scrollbar(frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(xscrollcommand=hsb.set)
         
         vsb.pack(side=tk.RIGHT, fill=tk.Y)
         hsb.pack(side=tk.BOTTOM, fill=tk.X)
@@ -132,76 +187,257 @@ class LogViewer(tk.Toplevel):
         self.detail_text.pack(fill=tk.BOTH, expand=True, pady=(2, 0))
         return frame
 
-    def _process_log_queue(self):
-        """從佇列中處理所有待處理的日誌"""
+    def notify_new_records(self):
+        """由 log handler 在放入新日誌後呼叫 (任何執行緒皆可)；每次處理佇列前只送出一個喚醒事件"""
+        # 注意：從其他執行緒呼叫 Tk 會等待 UI 執行緒處理完畢，因此不可在持有 UI 執行緒也會等待的鎖時記錄日誌
+        if self._drain_pending:
+            return
+        self._drain_pending = True
+        with suppress(tk.TclError, RuntimeError):
+            self.event_generate("<<NewLogRecord>>", when="tail")
+
+    def _poll_log_queue(self):
+        # 僅作為備援 (例如喚醒事件送出失敗)；平常日誌都由 <<NewLogRecord>> 立即處理
         try:
-            while not self.log_queue.empty():
-                log_entry = self.log_queue.get_nowait()
-                self.log_records.append(log_entry)
-                self._add_log_to_tree(log_entry)
+            self._drain_queue()
         finally:
-            self.after_id = self.after(100, self._process_log_queue)
-
-    def _add_log_to_tree(self, log_entry, index=tk.END):
-        """將一條日誌加入 Treeview"""
-        values = (
-            log_entry['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
-            log_entry['level'],
-            log_entry['source'],
-            log_entry['message'].split('\n')[0] # 只顯示第一行
-        )
-        tag = log_entry['level']
-        item_id = self.tree.insert("", index, values=values, tags=(tag,))
-        
+            self.after_id = self.after(1000, self._poll_log_queue)
+
+    def _drain_queue(self, event=None, max_records: int = 500):
+        """從佇列中處理待處理的日誌；每次最多處理 max_records 筆，剩餘的留到下次閒置時"""
+        self._drain_pending = False
+        records, has_more = self._take_pending(max_records)
+        if has_more:
+            self._drain_pending = True
+            self.after_idle(self._drain_queue)
+        if not records:
+            return
+        make_entry = self._make_log_entry
+        batch = [make_entry(record) for record in records]
+        self._append_records(batch)
+        if self._tree_stale or not self.winfo_viewable():
+            # 視窗預設隱藏，此時不必對 Treeview 做任何 Tk 呼叫
+            self._tree_stale = True
+            return
+        # 新日誌同樣套用目前的篩選條件；整批更新後只重繪一次可視範圍
+        self._view.extend(self._filtered(batch))
+        self._prune_view()
         if self.autoscroll_var.get():
-            self.tree.see(item_id)
-        return item_id
+            self._viewport_first = len(self._view)
+        self._render_viewport()
+
+    def _on_map(self, event):
+        # 子元件的 <Map> 也會傳到 Toplevel，只處理視窗本身
+        if event.widget is self and self._tree_stale:
+            self._apply_filters()
+
+    def _take_pending(self, max_records: int):
+        """一次取出至多 max_records 筆日誌，回傳 (records, 佇列是否還有剩餘)"""
+        q = self.log_queue
+        try:
+            # 只取得一次佇列的內部鎖，而非每筆 get_nowait() 各取一次
+            with q.mutex:
+                pending = q.queue
+                records = [pending.popleft() for _ in range(min(max_records, len(pending)))]
+                q.unfinished_tasks -= len(records)
+                return records, bool(pending)
+        except AttributeError:
+            # queue.Queue 的內部實作改變時，退回逐筆取出
+            records = []
+            with suppress(queue.Empty):
+                while len(records) < max_records:
+                    records.append(q.get_nowait())
+            return records, not q.empty()
+
+    def _append_records(self, batch: List[Dict[str, Any]]):
+        records, by_id = self.log_records, self.log_records_by_id
+        maxlen = records.maxlen
+        for log_entry in batch:
+            if len(records) == maxlen:
+                # deque 即將擠掉最舊的一筆，同步移除其索引
+                by_id.pop(records[0]['id'], None)
+            records.append(log_entry)
+            by_id[log_entry['id']] = log_entry
+
+    def _prune_view(self):
+        """移除 _view 中已被環狀緩衝區擠掉的記錄 (它們一定在最前面)"""
+        by_id = self.log_records_by_id
+        stale = 0
+        for rec in self._view:
+            if rec['id'] in by_id:
+                break
+            stale += 1
+        if stale:
+            del self._view[:stale]
+            self._viewport_first = max(0, self._viewport_first - stale)
+
+    def set_max_records(self, max_records: int):
+        """調整保留的日誌筆數上限 (由 PlayerApp 依設定檔呼叫)"""
+        max_records = max(1, int(max_records))
+        if max_records == self.max_records:
+            return
+        self.max_records = max_records
+        self.log_records = deque(self.log_records, maxlen=max_records)
+        self.log_records_by_id = {rec['id']: rec for rec in self.log_records}
+        self._prune_view()
+        self._render_viewport()
+
+    def _make_log_entry(self, record: logging.LogRecord) -> Dict[str, Any]:
+        message = self.formatter.format(record)
+        timestamp = datetime.fromtimestamp(record.created)
+        return {
+            'id': next(self._record_ids),
+            'timestamp': timestamp,
+            'level': record.levelname,
+            'source': record.name,
+            'message': message,
+            # 來源資訊只保留原始欄位，需要顯示或匯出時才組成字串 (見 _detail)
+            '_src': (record.pathname, record.lineno, record.funcName),
+            # 以下欄位在建立時計算一次，篩選重建時不必重複 lower()/strftime()/split()
+            '_msg_lower': message.lower(),
+            '_ts_str': timestamp.strftime(_TS_FORMAT),
+            '_msg_first_line': message.split('\n', 1)[0],  # 列表中只顯示第一行
+        }
+
+    @staticmethod
+    def _detail(rec: Dict[str, Any]) -> str:
+        pathname, lineno, func_name = rec['_src']
+        return f"檔案: {pathname}\n行號: {lineno}\n函式: {func_name}"
+
+    def _render_viewport(self):
+        """讓 Treeview 只顯示 _view[first:first+count]；與目前的列比對，只刪除/插入有變動的列"""
+        total, count = len(self._view), self._viewport_count
+        first = self._viewport_first = max(0, min(self._viewport_first, total - count))
+        visible = self._view[first:first + count]
+        new_iids = [str(rec['id']) for rec in visible]
+        if new_iids != self._rendered_iids:
+            tree = self.tree
+            keep = set(new_iids).intersection(self._rendered_iids)
+            removed = [iid for iid in self._rendered_iids if iid not in keep]
+            if removed:
+                tree.delete(*removed)
+            # 迴圈內的屬性查找先綁定為區域變數
+            insert, row_values = tree.insert, _ROW_VALUES
+            for index, rec in enumerate(visible):
+                iid = new_iids[index]
+                if iid not in keep:
+                    insert("", index, iid=iid, values=row_values(rec), tags=(rec['level'],))
+            self._rendered_iids = new_iids
+            selected = self._selected_iid
+            if selected and selected not in keep and selected in new_iids:
+                tree.selection_set(selected)
+                tree.focus(selected)
+        if total:
+            self.vsb.set(first / total, min(1.0, (first + count) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def _on_vscroll(self, action, amount, unit=None):
+        """捲軸的 command：依 moveto/scroll 調整可視範圍"""
+        if action == "moveto":
+            self._viewport_first = int(float(amount) * len(self._view))
+        else:
+            step = self._viewport_count if unit == "pages" else 1
+            self._viewport_first += int(amount) * step
+        self._render_viewport()
+        return "break"
+
+    def _scroll_units(self, units: int):
+        self._viewport_first += units
+        self._render_viewport()
+        return "break"
+
+    def _on_mouse_wheel(self, event):
+        # 滾輪每格 delta 為 120；觸控板等高精度裝置 (及 macOS) 的 delta 較小，至少捲動一格
+        if not event.delta:
+            return "break"
+        units = -round(event.delta / 120) or (-1 if event.delta > 0 else 1)
+        return self._scroll_units(units * 3)
+
+    def _on_arrow_key(self, direction: int):
+        """焦點在可視範圍邊緣時先捲動一列，再交給 Treeview 預設的方向鍵處理移動焦點"""
+        focus = self.tree.focus()
+        if self._rendered_iids and focus == self._rendered_iids[0 if direction < 0 else -1]:
+            self._viewport_first += direction
+            self._render_viewport()
+
+    def _on_tree_configure(self, event):
+        row_height = self._row_height()
+        # 扣掉標題列，避免最後一列只顯示一半而讓 Treeview 自行捲動
+        count = max(1, event.height // row_height - 1)
+        if count != self._viewport_count:
+            self._viewport_count = count
+            self._render_viewport()
+
+    def _row_height(self) -> int:
+        with suppress(tk.TclError, ValueError):
+            height = int(ttk.Style(self).lookup("Treeview", "rowheight") or 0)
+            if height > 0:
+                return height
+        if self._rendered_iids:
+            bbox = self.tree.bbox(self._rendered_iids[0])
+            if bbox:
+                return bbox[3]
+        return 20
+
+    def _schedule_filter(self, delay_ms: int = 150):
+        """搜尋框輸入時延遲重建，連續按鍵只觸發一次"""
+        if self._filter_after_id:
+            self.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.after(delay_ms, self._apply_filters)
 
     def _apply_filters(self):
         """根據目前的篩選和搜尋條件重新填充 Treeview"""
-        # 清空 Treeview
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        
+        if self._filter_after_id:
+            # 由勾選框等途徑直接呼叫時，取消尚未觸發的延遲重建
+            self.after_cancel(self._filter_after_id)
+            self._filter_after_id = None
+        self._tree_stale = False
+        self._view = list(self._filtered(self.log_records))
+        if self.autoscroll_var.get():
+            self._viewport_first = len(self._view)
+        self._render_viewport()
+
+    def _filtered(self, records: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        """依目前的篩選和搜尋條件過濾記錄；條件在迴圈外決定，迴圈內只剩必要的比對"""
         search_term = self.search_var.get().lower()
-        active_levels = {level for level, var in self.filter_vars.items() if var.get()}
-        
-        for record in self.log_records:
-            if record['level'] not in active_levels:
-                continue
-            if search_term and search_term not in record['message'].lower():
-                continue
-            
-            self._add_log_to_tree(record)
-            
+        active_levels = frozenset(level for level, var in self.filter_vars.items() if var.get())
+        if active_levels.issuperset(self.filter_vars):
+            if not search_term:
+                # 沒有任何篩選條件：直接加入全部記錄
+                return records
+            return (rec for rec in records if search_term in rec['_msg_lower'])
+        if not search_term:
+            return (rec for rec in records if rec['level'] in active_levels)
+        return (rec for rec in records if rec['level'] in active_levels and search_term in rec['_msg_lower'])
+
     def _on_log_select(self, event):
         """當使用者在 Treeview 中選擇一行時，更新詳細資訊"""
         selected_items = self.tree.selection()
-        if not selected_items: return
-        
-        item_id = selected_items[0]
-        # 透過 item id 找到原始的 log record
-        # 注意：這是一個較慢的操作，如果日誌量很大需要優化
-        item_index = self.tree.index(item_id)
-        
-        # 由於篩選，tree 的 index 和 log_records 的 index 可能不同
-        # 我們需要找到對應的 record
-        visible_records = [
-            rec for rec in self.log_records 
-            if self.filter_vars[rec['level']].get() and 
-               (not self.search_var.get() or self.search_var.get().lower() in rec['message'].lower())
-        ]
-        
-        if item_index < len(visible_records):
-            record = visible_records[item_index]
-            detail_content = f"--- 訊息 ---\n{record['message']}\n\n--- 來源 ---\n{record['detail']}"
-            self.detail_text.config(state="normal")
-            self.detail_text.delete(1.0, tk.END)
-            self.detail_text.insert(tk.END, detail_content)
-            self.detail_text.config(state="disabled")
+        if not selected_items:
+            # 列仍在 Treeview 中表示使用者取消了選取；列被捲出可視範圍而刪除時則保留
+            if self._selected_iid and self.tree.exists(self._selected_iid):
+                self._selected_iid = None
+            return
+
+        iid = self._selected_iid = selected_items[0]
+        if iid == self._detail_iid:
+            # 重新顯示時恢復的選取，詳細資訊不變
+            return
+        record = self.log_records_by_id.get(int(iid))
+        if record is None:
+            return
+        self._detail_iid = iid
+        detail_content = f"--- 訊息 ---\n{record['message']}\n\n--- 來源 ---\n{self._detail(record)}"
+        self.detail_text.config(state="normal")
+        self.detail_text.delete(1.0, tk.END)
+        self.detail_text.insert(tk.END, detail_content)
+        self.detail_text.config(state="disabled")
 
     def _clear_logs(self):
         self.log_records.clear()
+        self.log_records_by_id.clear()
+        self._selected_iid = self._detail_iid = None
         self._apply_filters() # 清空 Treeview
 
     def _export_logs(self):
@@ -218,21 +454,33 @@ class LogViewer(tk.Toplevel):
         if not file_path: return
         
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                if file_path.endswith('.json'):
-                    # 將 datetime 物件轉換為字串以便 JSON 序列化
-                    export_data = [
-                        {**rec, 'timestamp': rec['timestamp'].isoformat()} for rec in self.log_records
-                    ]
-                    json.dump(export_data, f, ensure_ascii=False, indent=2)
-                else:
+            if file_path.endswith('.json'):
+                # 逐筆序列化寫入 (每筆一行)，不在記憶體中另建一份完整的匯出清單
+                with open(file_path, 'wb') as f:
+                    f.write(b"[\n")
+                    for i, rec in enumerate(self.log_records):
+                        if i:
+                            f.write(b",\n")
+                        f.write(self._dump_export_entry(rec))
+                    f.write(b"\n]\n")
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
                     for rec in self.log_records:
-                        ts = rec['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-                        f.write(f"[{ts}][{rec['level']:<8}][{rec['source']}] {rec['message']}\n")
+                        f.write(f"[{rec['_ts_str']}][{rec['level']:<8}][{rec['source']}] {rec['message']}\n")
             messagebox.showinfo("成功", "日誌已成功匯出！", parent=self)
         except Exception as e:
             messagebox.showerror("錯誤", f"匯出失敗: {e}", parent=self)
 
+    @staticmethod
+    def _dump_export_entry(rec: Dict[str, Any]) -> bytes:
+        # 略過內部欄位，並將 datetime 物件轉換為字串以便 JSON 序列化
+        entry = {k: v for k, v in rec.items() if not k.startswith('_')}
+        entry['timestamp'] = rec['timestamp'].isoformat()
+        entry['detail'] = LogViewer._detail(rec)
+        if orjson:
+            return orjson.dumps(entry)
+        return json.dumps(entry, ensure_ascii=False).encode('utf-8')
+
     def toggle_visibility(self):
         if self.winfo_viewable():
             self.withdraw()
@@ -243,7 +491,8 @@ class LogViewer(tk.Toplevel):
 
     def close(self):
         """徹底關閉並清理資源"""
-        if self.after_id:
-            self.after_cancel(self.after_id)
-            self.after_id = None
+        for job in (self.after_id, self._filter_after_id):
+            if job:
+                self.after_cancel(job)
+        self.after_id = self._filter_after_id = None
         self.destroy()
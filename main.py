@@ -3,15 +3,17 @@ from __future__ import annotations
 import tkinter as tk
 import logging
 import sv_ttk
-import threading
-import subprocess
 import sys
 import json
+import time
+import urllib.error
 import urllib.request
+from importlib.metadata import version, PackageNotFoundError
 from packaging.version import parse as parse_version
 import multiprocessing # 匯入 multiprocessing
 
 from app import PlayerApp
+from async_worker import BG_EXEC
 from log_viewer import LogViewer, TkinterLogHandler
 
 def setup_logging(log_viewer: LogViewer):
@@ -20,43 +22,65 @@ def setup_logging(log_viewer: LogViewer):
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO) 
     
-    gui_handler = TkinterLogHandler(log_queue)
-    formatter = logging.Formatter('%(message)s')
-    gui_handler.setFormatter(formatter)
+    # 格式化由 LogViewer 在 Tk 執行緒上進行 (見 LogViewer.formatter)
+    gui_handler = TkinterLogHandler(log_queue, on_record=log_viewer.notify_new_records)
     
     if root_logger.hasHandlers():
         root_logger.handlers.clear()
     root_logger.addHandler(gui_handler)
 
+def enable_windows_dpi_awareness():
+    """在 Windows 上宣告 DPI 感知，避免系統以點陣圖縮放整個視窗 (須在建立 Tk 視窗前呼叫)"""
+    if sys.platform != 'win32':
+        return
+    try:
+        import ctypes
+        ctypes.windll.shcore.SetProcessDpiAwareness(1)
+    except (AttributeError, OSError):
+        # Windows 8.1 以前沒有 shcore
+        logging.warning("無法設定 DPI 感知。")
+
+UPDATE_CHECK_TTL_SEC = 6 * 60 * 60  # 遠端版本查詢結果的有效時間
+
+def fetch_remote_yt_dlp_version(config) -> str:
+    """取得 PyPI 上 yt-dlp 的最新版本；結果連同 ETag 快取在設定檔中，有效期間內不連網"""
+    cached = config.get("ytdlp_update_cache") or {}
+    if cached.get("remote_version") and time.time() - cached.get("checked_at", 0) < UPDATE_CHECK_TTL_SEC:
+        return cached["remote_version"]
+
+    request = urllib.request.Request("https://pypi.org/pypi/yt-dlp/json")
+    if cached.get("remote_version") and cached.get("etag"):
+        request.add_header("If-None-Match", cached["etag"])
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            remote_version_str = json.loads(response.read().decode())['info']['version']
+            etag = response.headers.get("ETag")
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            raise
+        # 內容未變更，沿用快取的版本
+        remote_version_str, etag = cached["remote_version"], cached.get("etag")
+
+    config.set("ytdlp_update_cache",
+               {"checked_at": time.time(), "remote_version": remote_version_str, "etag": etag})
+    return remote_version_str
+
 def check_for_yt_dlp_update(app_instance: PlayerApp):
     """在背景執行緒中透過 PyPI JSON API 檢查 yt-dlp 是否有新版本"""
     def worker():
         try:
-            # 1. 獲取本地安裝的版本
-            local_process = subprocess.run(
-                [sys.executable, "-m", "pip", "show", "yt-dlp"],
-                capture_output=True, text=True, check=True, encoding='utf-8',
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-            )
-            local_version_str = ""
-            for line in local_process.stdout.splitlines():
-                if line.startswith("Version:"):
-                    local_version_str = line.split(":")[1].strip()
-                    break
-            
-            if not local_version_str:
+            # 1. 獲取本地安裝的版本 (直接讀取套件中繼資料，不必另開 pip 行程)
+            try:
+                local_version_str = version("yt-dlp")
+            except PackageNotFoundError:
                 logging.warning("無法獲取本地 yt-dlp 版本。")
                 return
             
             local_version = parse_version(local_version_str)
 
-            # 2. 透過 PyPI 的 JSON API 獲取遠端最新版本
-            url = "https://pypi.org/pypi/yt-dlp/json"
+            # 2. 透過 PyPI 的 JSON API 獲取遠端最新版本 (有效期間內使用快取)
             try:
-                with urllib.request.urlopen(url, timeout=10) as response:
-                    data = json.loads(response.read().decode())
-                    remote_version_str = data['info']['version']
-                    remote_version = parse_version(remote_version_str)
+                remote_version = parse_version(fetch_remote_yt_dlp_version(app_instance.config))
             except Exception as e:
                 logging.error("從 PyPI API 獲取遠端 yt-dlp 版本失敗: %s", e)
                 return
@@ -70,18 +94,17 @@ def check_for_yt_dlp_update(app_instance: PlayerApp):
             else:
                 logging.info("yt-dlp 已是最新版本。")
 
-        except (subprocess.CalledProcessError, FileNotFoundError) as e:
-            logging.error("檢查 yt-dlp 更新時發生錯誤 (pip 指令問題): %s", e)
         except Exception as e:
             logging.exception("檢查 yt-dlp 更新時發生未預期的錯誤。")
 
-    update_thread = threading.Thread(target=worker, daemon=True)
-    update_thread.start()
+    # 交給共用的背景執行緒池，避免每次都建立新執行緒
+    BG_EXEC.submit(worker)
 
 if __name__ == "__main__":
     # 針對 Windows 打包環境的關鍵修復
     multiprocessing.freeze_support()
 
+    enable_windows_dpi_awareness()
     root = tk.Tk()
     sv_ttk.set_theme("dark")
 
@@ -1,7 +1,10 @@
 # utils.py
 import sys
+from functools import lru_cache
 from pathlib import Path
 
+# 掃描 PATH 的結果在執行期間幾乎不會改變，快取起來避免重複的檔案系統查詢
+@lru_cache(maxsize=8)
 def shutil_which(cmd: str) -> str | None:
     try:
         from shutil import which
@@ -9,6 +12,7 @@ def shutil_which(cmd: str) -> str | None:
     except Exception:
         return None
 
+@lru_cache(maxsize=1)
 def locate_ffmpeg_exe() -> str | None:
     exe_name = "ffmpeg.exe" if sys.platform.startswith('win') else "ffmpeg"
     path = shutil_which(exe_name)
@@ -18,3 +22,8 @@ def locate_ffmpeg_exe() -> str | None:
     if candidate.exists():
         return str(candidate)
     return None
+
+def clear_ffmpeg_cache():
+    """清除上述快取 (例如使用者在執行期間才安裝 ffmpeg)"""
+    shutil_which.cache_clear()
+    locate_ffmpeg_exe.cache_clear()